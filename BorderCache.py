@@ -0,0 +1,129 @@
+import numpy as np
+
+
+class BorderCache:
+    """
+    Tratamento de bordas para operações de vizinhança (filtros).
+
+    A cópia da imagem com bordas (padding) é criada uma vez por versão da imagem
+    e modo de borda, e reaproveitada por todos os filtros aplicados na mesma imagem:
+    um filtro com halo menor recebe apenas uma visão (slice) da cópia já existente.
+
+    Cada operação é dividida em duas partes:
+        interior: janelas totalmente dentro da imagem, lidas direto da imagem original;
+        bordas: quatro faixas estreitas, lidas da cópia com padding.
+    """
+
+    MODOS = ("edge", "reflect", "symmetric", "constant")
+
+    def __init__(self):
+        # (versao, modo) -> (halo, imagem com padding)
+        self._cache = {}
+
+    def descartar(self):
+        """Libera os paddings guardados (ex.: quando a imagem de origem foi substituída)."""
+        self._cache = {}
+
+    def __getstate__(self):
+        # O PADDING E SO CACHE: NAO PRECISA SER COPIADO ENTRE PROCESSOS
+        return {"_cache": {}}
+
+    @staticmethod
+    def halo(mask_shape):
+        """
+        Halo ((cima, baixo), (esquerda, direita)) de uma máscara, com o mesmo
+        alinhamento do conv_filter: o pixel central fica na posição (n // 2).
+        """
+        n_masklin, n_maskcol = mask_shape
+        return ((n_masklin // 2, n_masklin - 1 - n_masklin // 2),
+                (n_maskcol // 2, n_maskcol - 1 - n_maskcol // 2))
+
+    @staticmethod
+    def _pad(image, halo, modo):
+        """Cria a cópia com padding nos dois últimos eixos."""
+        pad = [(0, 0)] * (np.ndim(image) - 2) + [halo[0], halo[1]]
+        return np.pad(image, pad, mode=modo)
+
+    @staticmethod
+    def _fatia(padded, halo_guardado, halo, nlinhas, ncolunas):
+        """Visão de um padding maior com o halo pedido (sem cópia)."""
+        (t0, b0), (l0, r0) = halo_guardado
+        (t, b), (l, r) = halo
+        return padded[..., t0 - t:t0 + nlinhas + b, l0 - l:l0 + ncolunas + r]
+
+    def padded(self, image, halo, modo="edge", versao=None):
+        """
+        Retorna a imagem com padding de halo ((cima, baixo), (esquerda, direita)).
+        Se versao for informada o padding é guardado e reaproveitado enquanto a
+        versão for a mesma; pedidos com halo menor recebem uma visão sem cópia.
+        """
+        if modo not in self.MODOS:
+            raise ValueError(f"Modo de borda deve ser um de {self.MODOS}.")
+        if versao is None:
+            return self._pad(image, halo, modo)
+
+        nlinhas, ncolunas = np.shape(image)[-2:]
+        chave = (versao, modo)
+        halo_total = halo
+        guardado = self._cache.get(chave)
+        if guardado is not None:
+            halo_guardado, padded = guardado
+            if all(h_g >= h for lado_g, lado in zip(halo_guardado, halo) for h_g, h in zip(lado_g, lado)):
+                return self._fatia(padded, halo_guardado, halo, nlinhas, ncolunas)
+            # PRECISA DE UM HALO MAIOR: REFAZ O PADDING COM O MAIOR DE CADA LADO
+            halo_total = tuple(tuple(max(h_g, h) for h_g, h in zip(lado_g, lado))
+                               for lado_g, lado in zip(halo_guardado, halo))
+
+        # VERSOES ANTIGAS DA IMAGEM NAO SERAO MAIS USADAS
+        self._cache = {c: v for c, v in self._cache.items() if c[0] == versao}
+        padded = self._pad(image, halo_total, modo)
+        self._cache[chave] = (halo_total, padded)
+        return self._fatia(padded, halo_total, halo, nlinhas, ncolunas)
+
+    def apply(self, image, mask_shape, funcao, modo="edge", versao=None, apenas_interior=False):
+        """
+        Aplica uma operação de vizinhança em toda a imagem.
+        :param image: matriz (..., linhas, colunas)
+        :param mask_shape: tamanho (linhas, colunas) da vizinhança
+        :param funcao: função que recebe um bloco (..., h, w) e retorna o resultado
+                       das janelas válidas, de forma (..., h - linhas + 1, w - colunas + 1)
+        :param modo: modo de borda do np.pad ("edge", "reflect", "symmetric", "constant")
+        :param versao: versão da imagem, usada para reaproveitar o padding
+        :param apenas_interior: se True, calcula só o interior, sem nenhum padding
+        :return: matriz do mesmo tamanho da imagem (ou só o interior)
+        """
+        image = np.asarray(image)
+        n_masklin, n_maskcol = mask_shape
+        nlinhas, ncolunas = image.shape[-2:]
+        (cima, baixo), (esquerda, direita) = halo = self.halo(mask_shape)
+        interior_vazio = nlinhas < n_masklin or ncolunas < n_maskcol
+
+        if apenas_interior:
+            if interior_vazio:
+                raise ValueError("A imagem é menor que a máscara: não há interior.")
+            return funcao(image)
+
+        padded = self.padded(image, halo, modo, versao)
+        if interior_vazio:
+            return funcao(padded)
+
+        # CAMINHO RAPIDO: INTERIOR DIRETO DA IMAGEM, SEM PASSAR PELA COPIA COM BORDA
+        interior = funcao(image)
+        result = np.empty(interior.shape[:-2] + (nlinhas, ncolunas), dtype=interior.dtype)
+        result[..., cima:nlinhas - baixo, esquerda:ncolunas - direita] = interior
+
+        # FAIXAS DE BORDA: A SAIDA (i, j) USA AS LINHAS i..i+n_masklin-1 DO PADDING
+        ext_lin = n_masklin - 1
+        ext_col = n_maskcol - 1
+        faixas = [
+            (0, cima, 0, ncolunas),
+            (nlinhas - baixo, nlinhas, 0, ncolunas),
+            (cima, nlinhas - baixo, 0, esquerda),
+            (cima, nlinhas - baixo, ncolunas - direita, ncolunas),
+        ]
+        for lin0, lin1, col0, col1 in faixas:
+            if lin1 <= lin0 or col1 <= col0:
+                continue
+            bloco = padded[..., lin0:lin1 + ext_lin, col0:col1 + ext_col]
+            result[..., lin0:lin1, col0:col1] = funcao(bloco)
+        return result
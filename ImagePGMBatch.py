@@ -0,0 +1,192 @@
+import matplotlib.pyplot as plt
+import numpy as np
+
+from BorderCache import BorderCache
+from ImagePGMHelper import ImagePGMHelper
+
+
+class ImagePGMBatch:
+    """
+    Classe para processar várias imagens de mesmo tamanho de uma só vez.
+    As imagens ficam empilhadas em um único array contíguo (N, linhas, colunas),
+    de modo que cada operação é uma única chamada vetorizada sobre a pilha inteira.
+    Nos filtros, as bordas são tratadas por padrão replicando o pixel mais próximo.
+    """
+
+    def __init__(self, imagens=None):
+        """
+        :param imagens: lista de caminhos de arquivos PGM ou de objetos ImagePGMHelper,
+                        ou o caminho de um arquivo com várias imagens concatenadas
+        """
+        self.histograms = None
+        self.num_imagens = None
+        self.num_linhas = None
+        self.num_colunas = None
+        self.L = None
+        self._versao = 0
+        self._bordas = BorderCache()
+        self.matrizes = None
+        if imagens is not None:
+            self.load(imagens)
+
+    @property
+    def matrizes(self):
+        """Pilha (N, linhas, colunas) com as imagens do lote."""
+        return self._matrizes
+
+    @matrizes.setter
+    def matrizes(self, valor):
+        self._matrizes = valor
+        # NOVA VERSAO: O PADDING GUARDADO NAO VALE MAIS E PODE SER LIBERADO
+        self._bordas.descartar()
+        self._versao += 1
+
+    def load(self, imagens):
+        """
+        Carrega e empilha as imagens. Todas precisam ter o mesmo tamanho e o mesmo L.
+        :param imagens: lista de caminhos/ImagePGMHelper ou o caminho de um arquivo
+                        com várias imagens concatenadas
+        """
+        if isinstance(imagens, str):
+            imagens = ImagePGMHelper.stream(imagens)
+        helpers = [img if isinstance(img, ImagePGMHelper) else ImagePGMHelper(img) for img in imagens]
+        if len(helpers) == 0:
+            raise ValueError("Nenhuma imagem informada para o lote.")
+
+        formato = np.shape(helpers[0].matriz)
+        for helper in helpers:
+            if np.shape(helper.matriz) != formato:
+                raise ValueError("Todas as imagens do lote precisam ter o mesmo tamanho.")
+            if helper.L != helpers[0].L:
+                raise ValueError("Todas as imagens do lote precisam ter o mesmo número de níveis L.")
+
+        self.matrizes = np.ascontiguousarray(np.stack([helper.matriz for helper in helpers]))
+        self.num_imagens, self.num_linhas, self.num_colunas = self.matrizes.shape
+        self.L = helpers[0].L
+        self.histograms = None
+        return self.matrizes
+
+    def frame(self, indice):
+        """Retorna um ImagePGMHelper com uma cópia da imagem de índice informado."""
+        helper = ImagePGMHelper()
+        helper.matriz = self.matrizes[indice].copy()
+        helper.matriz_original = helper.matriz.copy()
+        helper.num_linhas = self.num_linhas
+        helper.num_colunas = self.num_colunas
+        helper.L = self.L
+        return helper
+
+    def frames(self):
+        """Retorna a lista de imagens do lote como objetos ImagePGMHelper."""
+        return [self.frame(i) for i in range(self.num_imagens)]
+
+    def show(self, indice, name=None):
+        plt.imshow(self.matrizes[indice], cmap='gray', vmin=0, vmax=self.L)
+        plt.axis('off')  # remove eixos
+        if name is not None:
+            plt.title(name)
+        plt.show()
+
+    def _pixels(self, niveis=None):
+        """
+        Retorna os pixels como inteiros, verificando se estão em [0, niveis-1] (padrão L).
+        Os caminhos com deslocamento por imagem (bincount, LUT por imagem) misturariam
+        as imagens em silêncio se um valor saísse dessa faixa.
+        """
+        if niveis is None:
+            niveis = self.L
+        pixels = self.matrizes.astype(int)
+        if pixels.min() < 0 or pixels.max() > niveis - 1:
+            raise ValueError(f"Pixels fora da faixa [0, {niveis - 1}]: "
+                             f"encontrados valores entre {pixels.min()} e {pixels.max()}.")
+        return pixels
+
+    def _niveis(self):
+        """
+        Número de níveis contados no histograma: L, ou mais se algum filtro
+        (ex.: passa-altas) deixou valores acima de L-1, como no ImagePGMHelper.
+        """
+        return max(self.L, int(np.max(self.matrizes)) + 1)
+
+    def _cabe_na_lut(self):
+        """Indica se todos os pixels estão em [0, L-1] e podem ser transformados por uma LUT de L posições."""
+        return np.min(self.matrizes) >= 0 and np.max(self.matrizes) <= self.L - 1
+
+    def apply_lut(self, lut):
+        """
+        Aplica uma tabela de transformação (LUT) em todas as imagens.
+        :param lut: array com L valores (mesma LUT para todo o lote)
+                    ou (N, L) valores (uma LUT por imagem); pode ter mais que L
+                    posições se houver pixels acima de L-1
+        """
+        lut = np.asarray(lut)
+        pixels = self._pixels(lut.shape[-1])
+        if lut.ndim == 1:
+            self.matrizes = lut[pixels]
+        else:
+            # DESLOCA CADA IMAGEM PARA A SUA PROPRIA LINHA DA LUT ACHATADA
+            offsets = (np.arange(self.num_imagens) * lut.shape[1])[:, None, None]
+            self.matrizes = lut.ravel()[pixels + offsets]
+        self.histograms = None
+
+    def thresholding_transformation(self, k):
+        """faz as fotos terem apenas os preto (0) e brando (L-1)
+        para os pontos que estao a baixo ou acima do k"""
+        if self._cabe_na_lut():
+            r = np.arange(self.L)
+            self.apply_lut(np.where(r <= k, 0, self.L - 1))
+        else:
+            self.matrizes = np.where(self.matrizes <= k, 0, self.L - 1)
+            self.histograms = None
+
+    def negative_transformation(self):
+        """
+        Inverte os niveis de cinza de todas as imagens.
+        fazendo
+            s = L - 1 - r
+        """
+        if self._cabe_na_lut():
+            self.apply_lut(self.L - 1 - np.arange(self.L))
+        else:
+            self.matrizes = self.L - 1 - self.matrizes
+            self.histograms = None
+
+    def get_histogram(self):
+        """
+        calcula e retorna um array (N, L) com o histograma de cada imagem.
+        Usa um único bincount, deslocando os pixels da imagem n em n * L.
+        Se algum filtro deixou valores acima de L-1, as colunas vão até o maior valor.
+        """
+        niveis = self._niveis()
+        offsets = (np.arange(self.num_imagens) * niveis)[:, None, None]
+        indices = (self._pixels(niveis) + offsets).ravel()
+        histograms = np.bincount(indices, minlength=self.num_imagens * niveis)
+        self.histograms = histograms.reshape(self.num_imagens, niveis)
+        return self.histograms
+
+    def equalize(self):
+        """
+        Realiza a equalização de cada imagem a partir da CDF do seu histograma.
+        """
+        histograms = self.get_histogram()
+        cdf = np.cumsum(histograms / (self.num_linhas * self.num_colunas), axis=1)
+        # MESMO ARREDONDAMENTO DO _adjust_final_value
+        transition_table = np.minimum(np.ceil((self.L - 1) * cdf), self.L - 1).astype(int)
+        self.apply_lut(transition_table)
+
+    def spacial_filter(self, mask, c_mask=None, modo="edge", **parametros):
+        """
+        Aplica um filtro espacial em todas as imagens do lote.
+        Aceita os mesmos argumentos do ImagePGMHelper.spacial_filter, inclusive nomes
+        de filtros cadastrados (ex.: "laplacian_3x3" ou o paramétrico "gaussian").
+        Como no ImagePGMHelper, filtros passa-altas podem deixar valores acima de L-1.
+        """
+        self.matrizes = ImagePGMHelper.spacial_response(self.matrizes, mask, c_mask, self._bordas, self._versao, modo,
+                                                        **parametros)
+        self.histograms = None
+
+    def statistical_filter(self, mask_size, metrica="moda", modo="edge"):
+        """Aplica um filtro estatistico em todas as imagens do lote."""
+        self.matrizes = ImagePGMHelper.statist_filter(self.matrizes, mask_size, metrica, self._bordas, self._versao,
+                                                      modo)
+        self.histograms = None
@@ -3,6 +3,11 @@ import math
 import numpy as np
 import os
 
+from BorderCache import BorderCache
+from ImagePyramid import ImagePyramid
+from PNMFormat import PNMReader, para_cinza
+from SpacialFilters import SpacialFilters
+
 
 class ImagePGMHelper:
     """Classe responsável por carregar e processar os arquivos de imagens."""
@@ -10,82 +15,147 @@ class ImagePGMHelper:
     def __init__(self, caminho_arquivo=None):
         """Criar os principais parâmetros da imagem"""
         self.histogram = None
+        self._histograma_versao = None
         self.num_linhas = None
         self.num_colunas = None
         self.L = None
+        self._versao = 0
+        self._piramide = None
+        self._piramide_versao = None
+        self._lut_float = None
+        # TRANSFORMACOES PENDENTES DO MODO FLOAT COMO (nome, parametros): SEM FUNCOES LOCAIS,
+        # PARA A IMAGEM CONTINUAR SERIALIZAVEL (EX.: NO PGMPipeline)
+        self._operacoes_float = []
+        self._lut_pendente = False
+        self._bordas = BorderCache()
         self.matriz = None
         self.matriz_original = None
         if caminho_arquivo is not None:
             self.load(caminho_arquivo)
 
+    @property
+    def matriz(self):
+        """Matriz de intensidades da imagem (quantiza antes as transformações pendentes do modo float)."""
+        if self._lut_pendente:
+            self.quantize()
+        return self._matriz
+
+    @matriz.setter
+    def matriz(self, valor):
+        self._matriz = valor
+        # UMA NOVA MATRIZ DESCARTA AS TRANSFORMACOES FLOAT AINDA NAO APLICADAS
+        if self._lut_float is not None:
+            self._lut_float = np.arange(self.L, dtype=np.float32)
+        self._operacoes_float = []
+        self._lut_pendente = False
+        # O PADDING DA MATRIZ ANTERIOR NAO SERA MAIS LIDO
+        self._bordas.descartar()
+        self._marcar_alterada()
+
+    def _marcar_alterada(self):
+        """Registra que a matriz mudou, invalidando os dados derivados dela (ex.: pirâmide, histograma)."""
+        self._versao += 1
+
+    def _histograma_valido(self):
+        """Indica se self.histogram corresponde à matriz atual."""
+        return self.histogram is not None and self._histograma_versao == self._versao
+
+    def _guardar_histograma(self, histogram):
+        """Guarda o histograma como válido para a versão atual da matriz."""
+        self.histogram = list(histogram)
+        self._histograma_versao = self._versao
+
+    def pyramid(self, modo="gaussian", borda="edge"):
+        """
+        Retorna a pirâmide de resolução da imagem atual.
+        A pirâmide é reaproveitada enquanto a matriz não mudar.
+        :param modo: "gaussian" ou "media"
+        :param borda: tratamento das bordas no modo "gaussian" (como no BorderCache)
+        """
+        # QUANTIZA ANTES AS TRANSFORMACOES PENDENTES DO MODO FLOAT, QUE MUDAM A VERSAO
+        self.quantize()
+        if self._piramide is None or self._piramide.modo != modo or self._piramide.borda != borda \
+                or self._piramide_versao != self._versao:
+            self._piramide = ImagePyramid(self.matriz, modo, borda)
+            self._piramide_versao = self._versao
+        return self._piramide
+
+    def _imagem_nivel(self, nivel, modo="gaussian"):
+        """Retorna a matriz no nível de resolução informado (0 = resolução original), para prévias."""
+        if nivel == 0:
+            return self.matriz
+        return self.pyramid(modo).nivel(nivel)
+
+    def _amostra_nivel(self, nivel):
+        """
+        Amostra da matriz com um pixel a cada 2**nivel em cada eixo, para estimativas
+        (histograma, limiares, LUTs). É uma visão sem cópia: custa só os pixels lidos,
+        bem menos que suavizar a imagem inteira como a pirâmide gaussiana.
+        """
+        if nivel < 0:
+            raise ValueError("O nível deve ser maior ou igual a zero.")
+        passo = 2 ** nivel
+        return self.matriz[::passo, ::passo]
+
     @staticmethod
     def map_array(arr, map1_start, map1_end, map2_start, map2_end):
         """Mapeia os valores do array numpy do range [map1_start, map1_end] para o [map2_start, map2_end]"""
         return map2_start + (arr - map1_start) * (map2_end - map2_start) / (map1_end - map1_start)
 
-    def load(self, caminho_arquivo):
-        with open(caminho_arquivo, 'rb') as f:
-
-            tipo = f.readline().strip()
-            if tipo not in [b'P2', b'P5']:
-                raise ValueError('Apenas imagens PGM nos formatos P2 (ASCII) ou P5 (binário) são suportadas.')
-
-            # Função auxiliar para ler linhas ignorando comentários
-            def ler_linha_valida():
-                linha = f.readline()
-                while linha.startswith(b'#') or linha.strip() == b'':
-                    linha = f.readline()
-                return linha
-
-            # Lê dimensões
-            linha = ler_linha_valida()
-            while linha.strip() == b'':
-                linha = ler_linha_valida()
-            largura, altura = map(int, linha.strip().split())
-            self.num_colunas = largura
-            self.num_linhas = altura
-
-            # Lê valor máximo de cinza
-            max_valor = int(ler_linha_valida().strip())
-            self.L = max_valor + 1
-
-            # Lê os dados de pixels
-            if tipo == b'P2':
-                # ASCII
-                dados = []
-                for linha in f:
-                    if linha.startswith(b'#'):
-                        continue
-                    dados.extend(map(int, linha.strip().split()))
-            else:
-                # P5 binário — pula qualquer byte restante antes dos dados de imagem
-                resto = f.read(1)
-                while resto.isspace():
-                    resto = f.read(1)
-                dados_bin = resto + f.read(largura * altura - 1)
-                dados = list(dados_bin)
-
-            # Converte os dados em matriz 2D
-            matriz = []
-            for i in range(altura):
-                linha = dados[i * largura:(i + 1) * largura]
-                matriz.append(linha)
-
-            self.matriz = np.array(matriz)
-            self.matriz_original = np.array(matriz)
-            return matriz
-
-    def salvar_como_pgm(self, caminho_arquivo):
-        """Salva a imagem atual (matriz) no formato PGM P2."""
+    def load(self, caminho_arquivo, indice=0):
+        """
+        Carrega uma imagem PBM, PGM ou PPM (P1 a P6) em níveis de cinza.
+        :param caminho_arquivo: caminho do arquivo
+        :param indice: posição da imagem em arquivos com várias imagens concatenadas
+        """
+        with PNMReader(caminho_arquivo) as leitor:
+            for i, (tipo, dados, max_valor) in enumerate(leitor.frames()):
+                if i == indice:
+                    self._carregar_frame(tipo, dados, max_valor)
+                    return self.matriz
+        raise ValueError(f"O arquivo não tem a imagem de índice {indice}.")
+
+    def _carregar_frame(self, tipo, dados, max_valor):
+        """Converte os dados lidos pelo PNMReader e preenche os parâmetros da imagem."""
+        matriz, self.L = para_cinza(tipo, dados, max_valor)
+        self.num_linhas, self.num_colunas = matriz.shape
+        self.matriz = matriz
+        self.matriz_original = matriz.copy()
+
+    @classmethod
+    def stream(cls, caminho_arquivo):
+        """
+        Gera as imagens de um arquivo com várias imagens concatenadas, uma de cada vez.
+        Apenas a imagem atual fica em memória; o arquivo é lido com um único handle aberto.
+        """
+        with PNMReader(caminho_arquivo) as leitor:
+            for tipo, dados, max_valor in leitor.frames():
+                imagem = cls()
+                imagem._carregar_frame(tipo, dados, max_valor)
+                yield imagem
+
+    def salvar_como_pgm(self, caminho_arquivo, formato="P2"):
+        """Salva a imagem atual (matriz) no formato PGM P2 (ASCII) ou P5 (binário)."""
         if self.matriz is None:
             raise ValueError("Nenhuma matriz carregada para salvar.")
         if caminho_arquivo is None:
                     raise ValueError("Nome não definido para a imagem.")
+        if formato not in ["P2", "P5"]:
+            raise ValueError("Apenas os formatos P2 (ASCII) ou P5 (binário) são suportados.")
 
         altura = self.num_linhas
         largura = self.num_colunas
         max_valor = self.L - 1
 
+        if formato == "P5":
+            # P5 usa 1 byte por pixel ate 255 e 2 bytes (big-endian) acima disso
+            dtype = np.uint8 if max_valor < 256 else np.dtype('>u2')
+            dados = np.clip(self.matriz, 0, max_valor).astype(dtype)
+            with open(caminho_arquivo, 'wb') as f:
+                f.write(f"P5\n{largura} {altura}\n{max_valor}\n".encode('ascii'))
+                f.write(dados.tobytes())
+            return
+
         with open(caminho_arquivo, 'w') as f:
             f.write("P2\n")
             f.write(f"{largura} {altura}\n")
@@ -95,26 +165,280 @@ class ImagePGMHelper:
                 linha_str = ' '.join(str(min(max(int(p), 0), max_valor)) for p in linha)
                 f.write(linha_str + "\n")
 
-    def show(self, name=None):
-        plt.imshow(self.matriz, cmap='gray', vmin=0, vmax=self.L)
+    def show(self, name=None, nivel=0):
+        """Exibe a imagem; nivel > 0 exibe uma prévia reduzida da pirâmide."""
+        plt.imshow(self._imagem_nivel(nivel), cmap='gray', vmin=0, vmax=self.L)
         plt.axis('off')  # remove eixos
         if name is not None:
             plt.title(name)
         plt.show()
         pass
 
+    def apply_lut(self, lut):
+        """
+        Aplica uma tabela de transformação (LUT) na imagem: s = lut[r].
+        Se o histograma atual é conhecido, o novo histograma é obtido mapeando
+        o antigo pela LUT, em O(L), sem percorrer os pixels novamente.
+        :param lut: sequência com L valores
+        """
+        if self._lut_pendente:
+            self.quantize()
+        lut = np.asarray(lut)
+        pixels = self.matriz.astype(int)
+        if pixels.min() < 0 or pixels.max() >= len(lut):
+            raise ValueError(f"Pixels fora da faixa da LUT [0, {len(lut) - 1}]: "
+                             f"encontrados valores entre {pixels.min()} e {pixels.max()}.")
+        histogram = None
+        if self._histograma_valido() and len(self.histogram) == self.L and len(lut) == self.L:
+            # O HISTOGRAMA CONTA int(r), ENTAO O MAPEAMENTO USA A LUT TRUNCADA
+            destino = np.trunc(lut).astype(int)
+            if destino.min() >= 0 and destino.max() < self.L:
+                histogram = np.bincount(destino, weights=self.histogram, minlength=self.L).astype(int)
+        self.matriz = lut[pixels]
+        if histogram is not None:
+            self._guardar_histograma(histogram.tolist())
+
+    def _cabe_na_lut(self):
+        """Indica se a matriz tem apenas valores inteiros em [0, L-1] e pode ser transformada por LUT."""
+        matriz = self._matriz
+        if matriz.min() < 0 or matriz.max() > self.L - 1:
+            return False
+        return np.issubdtype(matriz.dtype, np.integer) or np.array_equal(matriz, np.trunc(matriz))
+
+    def float_mode(self, ativo=True):
+        """
+        Liga ou desliga o modo de trabalho em float.
+        No modo float as transformações pontuais (log, gamma, negativo, limiar) não
+        são quantizadas: elas são compostas em uma tabela float32 de L posições
+        e a imagem só é quantizada uma vez, quando outra operação precisar dos pixels
+        (ex.: filtros, histograma, show) ou quando quantize() for chamado.
+        :param ativo: True para ligar, False para quantizar e desligar
+        """
+        if ativo:
+            if self._lut_float is None:
+                self._lut_float = np.arange(self.L, dtype=np.float32)
+        else:
+            self.quantize()
+            self._lut_float = None
+            self._operacoes_float = []
+
+    def quantize(self):
+        """Aplica as transformações pendentes do modo float quantizando uma única vez em L níveis."""
+        if not self._lut_pendente:
+            return
+        self._lut_pendente = False
+        lut = self._adjust_final_array(self._lut_float)
+        operacoes = self._operacoes_float
+        self._lut_float = np.arange(self.L, dtype=np.float32)
+        self._operacoes_float = []
+        if self._cabe_na_lut():
+            self.apply_lut(lut)
+        else:
+            # PIXELS FORA DE [0, L-1] OU NAO INTEIROS: AVALIA AS FUNCOES NA PROPRIA MATRIZ
+            valores = np.asarray(self._matriz, dtype=np.float32)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                for nome, parametros in operacoes:
+                    valores = self._funcao_pontual(valores.astype(float), nome, parametros).astype(np.float32)
+            self.matriz = self._adjust_final_array(valores)
+
+    def _funcao_pontual(self, r, nome, parametros):
+        """Avalia a transformação pontual nome(r) ("limiar", "negativo", "log" ou "gamma")."""
+        if nome == "limiar":
+            return np.where(r <= parametros["k"], 0.0, self.L - 1.0)
+        if nome == "negativo":
+            return self.L - 1 - r
+        if nome == "log":
+            c = parametros["c"]
+            s_max = (math.log(1 + (self.L-1))) * c
+            return self.map_array(np.log1p(r) * c, 0, s_max, 0, (self.L-1))
+        if nome == "gamma":
+            c, y = parametros["c"], parametros["y"]
+            s_max = c * ((self.L - 1) ** y)
+            return self.map_array(c * (r ** y), 0, s_max, 0, (self.L - 1))
+        raise ValueError(f"Transformação pontual '{nome}' não encontrada.")
+
+    def _point_transformation(self, nome, **parametros):
+        """
+        Aplica a transformação pontual s = funcao(r), com funcao dada por _funcao_pontual.
+        No modo float a função é composta com as anteriores sem quantizar;
+        senão é avaliada nos L níveis e aplicada como LUT já quantizada.
+        Se a matriz não tiver apenas inteiros em [0, L-1] a LUT não serve, e a
+        função é avaliada direto na matriz, quantizando uma única vez.
+        Os valores são calculados em float64 e guardados em float32.
+        """
+        def funcao(r):
+            return self._funcao_pontual(r, nome, parametros)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if self._lut_float is not None:
+                self._lut_float = funcao(self._lut_float.astype(float)).astype(np.float32)
+                self._operacoes_float.append((nome, parametros))
+                self._lut_pendente = True
+            elif self._cabe_na_lut():
+                lut = funcao(np.arange(self.L, dtype=float)).astype(np.float32)
+                self.apply_lut(self._adjust_final_array(lut))
+            else:
+                valores = funcao(np.asarray(self.matriz, dtype=float)).astype(np.float32)
+                self.matriz = self._adjust_final_array(valores)
+
     def thresholding_transformation(self, k):
         """faz a foto ter apenas os preto (0) e brando (L-1)
         para os pontos que estao a baixo ou acima do k"""
+        if self._lut_float is not None:
+            self._point_transformation("limiar", k=k)
+        elif self._cabe_na_lut():
+            self.apply_lut(np.where(np.arange(self.L) <= k, 0, self.L - 1))
+        else:
+            self.matriz = np.where(self.matriz <= k, 0, self.L - 1)
 
-        for i in range(self.num_linhas):
-            for j in range(self.num_colunas):
-                r = self.matriz[i][j]
-                if r <= k:
-                    self.matriz[i][j] = 0
-                else:
-                    self.matriz[i][j] = self.L - 1
-        pass
+    @staticmethod
+    def otsu_threshold(histogram):
+        """
+        Escolhe o limiar k que maximiza a variância entre as classes (método de Otsu).
+        Usa somas acumuladas do histograma, custo O(L).
+        :param histogram: histograma da imagem (lista ou array com L posições)
+        :return: limiar k; os pixels r <= k formam a classe escura
+        """
+        p = np.asarray(histogram, dtype=float)
+        p = p / p.sum()
+        niveis = np.arange(len(p))
+        omega = np.cumsum(p)
+        mu = np.cumsum(niveis * p)
+        mu_t = mu[-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sigma_b = (mu_t * omega - mu) ** 2 / (omega * (1.0 - omega))
+        sigma_b = np.nan_to_num(sigma_b, nan=0.0, posinf=0.0)
+        return int(np.argmax(sigma_b))
+
+    # LIMITE DE POSICOES DO HISTOGRAMA NO OTSU MULTINIVEL (MATRIZES DE BINS x BINS)
+    MAX_BINS_MULTI_OTSU = 256
+
+    @staticmethod
+    def multi_otsu_thresholds(histogram, classes=3):
+        """
+        Otsu multinível: escolhe classes - 1 limiares que maximizam a variância entre as classes.
+        Usa programação dinâmica sobre as somas acumuladas, custo O(classes * L²).
+        Histogramas com mais de MAX_BINS_MULTI_OTSU posições (ex.: imagens de 16 bits)
+        são agrupados em faixas iguais antes da busca, e cada limiar volta como o
+        último nível da sua faixa; a precisão fica limitada à largura da faixa.
+        :param histogram: histograma da imagem (lista ou array com L posições)
+        :param classes: número de classes desejado (>= 2)
+        :return: lista crescente de limiares; a classe c contém k[c-1] < r <= k[c]
+        """
+        if classes < 2:
+            raise ValueError("São necessárias pelo menos 2 classes.")
+        p = np.asarray(histogram, dtype=float)
+        p = p / p.sum()
+        fator = 1
+        if len(p) > ImagePGMHelper.MAX_BINS_MULTI_OTSU:
+            # AGRUPA fator NIVEIS CONSECUTIVOS EM CADA POSICAO
+            fator = int(np.ceil(len(p) / ImagePGMHelper.MAX_BINS_MULTI_OTSU))
+            p = np.pad(p, (0, (-len(p)) % fator)).reshape(-1, fator).sum(axis=1)
+        L = len(p)
+        if classes > L:
+            raise ValueError("Mais classes do que níveis de cinza.")
+        # SOMAS ACUMULADAS COM ZERO NA FRENTE: P[b+1] - P[a] = soma de p[a..b]
+        P = np.concatenate(([0.0], np.cumsum(p)))
+        S = np.concatenate(([0.0], np.cumsum(np.arange(L) * p)))
+
+        # custo[a, b] = omega * mu² da classe que vai do nivel a ate o nivel b
+        a = np.arange(L)[:, None]
+        b = np.arange(L)[None, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            custo = (S[b + 1] - S[a]) ** 2 / (P[b + 1] - P[a])
+        custo = np.where(b >= a, np.nan_to_num(custo, nan=0.0), -np.inf)
+
+        # melhor[b] = maior soma usando as classes ja colocadas nos niveis 0..b
+        melhor = custo[0].copy()
+        escolhas = []
+        for _ in range(classes - 1):
+            # A NOVA CLASSE COMECA EM a (a >= 1) E A ANTERIOR TERMINA EM a - 1
+            candidatos = np.full((L, L), -np.inf)
+            candidatos[1:, :] = melhor[:-1, None] + custo[1:, :]
+            inicio = np.argmax(candidatos, axis=0)
+            melhor = candidatos[inicio, np.arange(L)]
+            escolhas.append(inicio)
+
+        # RECONSTROI OS LIMIARES A PARTIR DA ULTIMA CLASSE
+        limiares = []
+        fim = L - 1
+        for inicio in reversed(escolhas):
+            fim = inicio[fim] - 1
+            limiares.append((int(fim) + 1) * fator - 1)
+        return limiares[::-1]
+
+    def auto_thresholding(self, metodo="otsu", classes=3, nivel=0):
+        """
+        Limiarização com limiar escolhido automaticamente a partir do histograma.
+        O resultado é aplicado como uma LUT.
+        :param metodo: "otsu" (binária) ou "multi_otsu" (classes níveis igualmente espaçados)
+        :param classes: número de classes do "multi_otsu"
+        :param nivel: nível de amostragem usado para estimar o histograma
+                      (um pixel a cada 2**nivel em cada eixo)
+        :return: lista de limiares escolhidos
+        """
+        histogram = self.get_histogram(nivel)
+        if metodo == "otsu":
+            limiares = [self.otsu_threshold(histogram)]
+        elif metodo == "multi_otsu":
+            limiares = self.multi_otsu_thresholds(histogram, classes)
+        else:
+            raise ValueError("Método deve ser 'otsu' ou 'multi_otsu'.")
+
+        # CADA CLASSE RECEBE UM NIVEL IGUALMENTE ESPACADO ENTRE 0 E L-1
+        classe = np.searchsorted(limiares, np.arange(self.L), side="left")
+        lut = np.rint(classe * (self.L - 1) / len(limiares)).astype(int)
+        self.apply_lut(lut)
+        return limiares
+
+    @staticmethod
+    def _soma_janelas(integral, mask_size, nlinhas, ncolunas):
+        """Soma de cada janela mask_size x mask_size a partir da imagem integral (4 acessos)."""
+        m = mask_size
+        return (integral[m:m + nlinhas, m:m + ncolunas] - integral[:nlinhas, m:m + ncolunas]
+                - integral[m:m + nlinhas, :ncolunas] + integral[:nlinhas, :ncolunas])
+
+    def adaptive_thresholding(self, mask_size=15, metodo="media", c=0.0, k=0.2, R=None, modo="edge"):
+        """
+        Limiarização adaptativa: cada pixel é comparado com um limiar da sua vizinhança.
+        Média e desvio padrão locais vêm de imagens integrais, com custo fixo por pixel.
+        fazendo
+            media:   T = m - c
+            sauvola: T = m * (1 + k * (s / R - 1))
+        onde m e s são a média e o desvio padrão da janela.
+        :param mask_size: tamanho (ímpar) da janela
+        :param metodo: "media" ou "sauvola"
+        :param c: constante subtraída da média no método "media"
+        :param k: sensibilidade do método "sauvola"
+        :param R: faixa dinâmica do desvio padrão no "sauvola" (padrão L / 2)
+        :param modo: tratamento das bordas, como no conv_filter
+        """
+        if mask_size % 2 == 0:
+            raise ValueError("O tamanho da janela deve ser ímpar.")
+        if metodo not in ("media", "sauvola"):
+            raise ValueError("Método deve ser 'media' ou 'sauvola'.")
+        if R is None:
+            R = self.L / 2
+
+        imagem = np.asarray(self.matriz, dtype=float)
+        nlinhas, ncolunas = imagem.shape
+        halo = mask_size // 2
+        padded = self._bordas.padded(self.matriz, ((halo, halo), (halo, halo)), modo, self._versao).astype(float)
+        n = mask_size * mask_size
+
+        integral = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1))
+        integral[1:, 1:] = padded.cumsum(axis=0).cumsum(axis=1)
+        media = self._soma_janelas(integral, mask_size, nlinhas, ncolunas) / n
+
+        if metodo == "media":
+            limiar = media - c
+        else:
+            integral[1:, 1:] = (padded * padded).cumsum(axis=0).cumsum(axis=1)
+            quadrados = self._soma_janelas(integral, mask_size, nlinhas, ncolunas) / n
+            desvio = np.sqrt(np.maximum(quadrados - media * media, 0.0))
+            limiar = media * (1 + k * (desvio / R - 1))
+
+        self.matriz = np.where(imagem <= limiar, 0, self.L - 1)
 
     def negative_transformation(self):
         """
@@ -122,11 +446,12 @@ class ImagePGMHelper:
         fazendo
             s = L - 1 - r
         """
-        for i in range(self.num_linhas):
-            for j in range(self.num_colunas):
-                r = self.matriz[i][j]
-                self.matriz[i][j] = self.L - 1 - r
-        pass
+        if self._lut_float is not None:
+            self._point_transformation("negativo")
+        elif self._cabe_na_lut():
+            self.apply_lut(self.L - 1 - np.arange(self.L))
+        else:
+            self.matriz = self.L - 1 - self.matriz
 
     def log_transformation(self, c=1.0):
         """
@@ -138,20 +463,10 @@ class ImagePGMHelper:
                 c > 0 : deixa imagem mais clara
                 c < 0 : deixa imagem mais escura
         :param c: constante de transformação
+        O resultado é normalizado para [0, L-1] e quantizado uma única vez
+        (no modo float a quantização fica adiada, ver float_mode).
         """
-        for i in range(self.num_linhas):
-            for j in range(self.num_colunas):
-                r = self.matriz[i][j]
-                # APLICA A TRANSFORMACAO
-                s = (math.log(1 + r)) * c
-                # print(f"({i},{j}) r = {r} -> s = {s}")
-                # APLICA O VALOR AJUSTADO NA MATRIZ
-                # self.matriz[i][j] = self._adjust_final_value(s)
-                self.matriz[i][j] = s
-
-        s_max = (math.log(1 + (self.L-1))) * c
-        self.matriz = self.map_array(self.matriz, 0, s_max, 0, (self.L-1))
-        pass
+        self._point_transformation("log", c=c)
 
     def _adjust_final_value(self, s):
         """Arredonda o valor para o inteiro superior e satura se passar do L maximo."""
@@ -160,6 +475,10 @@ class ImagePGMHelper:
             s = self.L - 1
         return s
 
+    def _adjust_final_array(self, arr):
+        """Versão vetorizada de _adjust_final_value: arredonda para cima e satura em [0, L-1]."""
+        return np.clip(np.ceil(arr), 0, self.L - 1).astype(int)
+
     def gamma_transformation(self, c=1.0, y=1.0):
         """
         Power-Law (Gamma) Transformations
@@ -177,37 +496,34 @@ class ImagePGMHelper:
                 y > 1 : deixa imagem mais escura
         :param c: constante multiplicativa
         :param y: constante exponencial
+        O resultado é normalizado para [0, L-1] e quantizado uma única vez
+        (no modo float a quantização fica adiada, ver float_mode).
+        """
+        self._point_transformation("gamma", c=c, y=y)
+
+    def get_histogram(self, nivel=0):
+        """
+        calcula e retorna uma lista com o histograma da imagem.
+        O histograma do nível 0 fica guardado em self.histogram e só é recontado
+        quando a matriz muda por uma operação que não permite derivá-lo (ex.: filtros).
+        :param nivel: nível de amostragem usado na contagem (0 = resolução original);
+                      conta um pixel a cada 2**nivel em cada eixo.
         """
-        for i in range(self.num_linhas):
-            for j in range(self.num_colunas):
-                r = self.matriz[i][j]
-                # APLICA A TRANSFORMACAO
-                s = c * (r ** y)
-                # APLICA O VALOR AJUSTADO NA MATRIZ
-                # self.matriz[i][j] = self._adjust_final_value(s)
-                self.matriz[i][j] = s
-
-        s_max = c * ((self.L - 1) ** y)
-        self.matriz = self.map_array(self.matriz, 0, s_max, 0, (self.L - 1))
-
-    def get_histogram(self):
-        """calcula e retorna uma lista com o histograma da imagem."""
-        histogram = [0] * self.L
-        # INICIALIZA O HISTOGRAMA COM VALORES ZERADOS
-        for i in range(self.L):
-            histogram[i] = 0
-        # PERCORRE A IMAGEM PARA CONTAR AS CORES
-        for i in range(self.num_linhas):
-            for j in range(self.num_colunas):
-                r = self.matriz[i][j]
-                histogram[int(r)] += 1
-
-        self.histogram = histogram
+        if self._lut_pendente:
+            self.quantize()
+        if nivel == 0 and self._histograma_valido():
+            return self.histogram
+        imagem = self._amostra_nivel(nivel)
+        # CONTA AS CORES DE TODOS OS PIXELS DE UMA VEZ
+        histogram = np.bincount(np.asarray(imagem).astype(int).ravel(), minlength=self.L).tolist()
+
+        if nivel == 0:
+            self._guardar_histograma(histogram)
         return histogram
 
     def show_hist(self):
         """Exibe o histograma"""
-        plt.stem(self.histogram)
+        plt.stem(self.get_histogram())
         plt.title("Histograma de Intensidades")
         plt.xlabel("Nível de Cinza")
         plt.ylabel("Frequência")
@@ -215,129 +531,244 @@ class ImagePGMHelper:
         plt.show()
 
     @staticmethod
-    def conv_filter(image, mask, c_mask):
-        """faz a convolucao de um filtro espacial em uma matriz de uma figura"""
-        n_masklin, n_maskcol = np.shape(mask)
-
-        new_matriz_img = np.zeros(np.shape(image))
-
-        nlinhas, ncolunas = np.shape(image)
-        # print(f"Linhas: {nlinhas}, Colunas: {ncolunas}")
-
-        # PERCORRE A IMAGEM
-        for x in range(nlinhas):
-            for y in range(ncolunas):
-                r = image[x][y]
-                # print(f"({x},{y}) = {r}")
-                # PERCORRE A MASCARA NO PONTO DA IMAGEM
-                sum = 0
-                adjust_x = x - (n_masklin // 2)
-                adjust_y = y - (n_maskcol // 2)
-                for i in range(n_masklin):
-                    for j in range(n_maskcol):
-                        try:
-                            sum += c_mask * mask[i][j] * image[adjust_x + i][adjust_y + j]
-                        except:
-                            # print(f"pos {adjust_x + i},{adjust_y + j} deu pau")
-                            sum += c_mask * mask[i][j] * r
-                # seta valor filtradon na nova imagem
-                new_matriz_img[x][y] = int(sum)
-                # print(f"({x},{y}) = {r} -> {sum}")
-        return new_matriz_img
-
-    def spacial_filter(self, mask, c_mask):
-        """Aplica um filtro espacial em uma imagem."""
-        self.matriz = self.conv_filter(self.matriz, mask, c_mask)
-        if np.min(self.matriz) < 0:
-          self.matriz = np.abs(self.matriz)
+    def conv_filter(image, mask, c_mask, bordas=None, versao=None, modo="edge"):
+        """
+        faz a convolucao de um filtro espacial em uma matriz de uma figura.
+        Cada peso da máscara soma uma fatia deslocada da imagem (vetorizado).
+        :param bordas: BorderCache usado para reaproveitar o padding entre filtros
+        :param versao: versão da imagem (chave do padding guardado em bordas)
+        :param modo: tratamento das bordas ("edge", "reflect", "symmetric", "constant")
+        """
+        mask = np.asarray(mask)
+        n_masklin, n_maskcol = mask.shape
+
+        def correlacao(bloco):
+            nlinhas = bloco.shape[-2] - n_masklin + 1
+            ncolunas = bloco.shape[-1] - n_maskcol + 1
+            soma = np.zeros(bloco.shape[:-2] + (nlinhas, ncolunas))
+            for i in range(n_masklin):
+                for j in range(n_maskcol):
+                    if mask[i][j] != 0:
+                        soma += c_mask * mask[i][j] * bloco[..., i:i + nlinhas, j:j + ncolunas]
+            return np.trunc(soma)
+
+        if bordas is None:
+            bordas = BorderCache()
+        return bordas.apply(image, mask.shape, correlacao, modo=modo, versao=versao)
+
+    def spacial_filter(self, mask, c_mask=None, modo="edge", **parametros):
+        """
+        Aplica um filtro espacial em uma imagem.
+        :param mask: matriz de pesos ou nome de um filtro cadastrado em SpacialFilters
+                     (ex.: "lowpass_3x3" ou o paramétrico "gaussian")
+        :param c_mask: constante da máscara; se None usa a constante cadastrada (ou 1.0)
+        :param modo: tratamento das bordas, como no conv_filter
+        :param parametros: parâmetros do filtro paramétrico (ex.: sigma=3.0)
+        """
+        self.matriz = self.spacial_response(self.matriz, mask, c_mask, self._bordas, self._versao, modo,
+                                            **parametros)
 
     @staticmethod
-    def statist_filter(image, mask_size, metrica="moda"):
-        """Executa um filtro estatistico na imagem"""
-
-        mask = np.ones((mask_size, mask_size))
-        n_masklin, n_maskcol = np.shape(mask)
-        new_matriz_img = np.zeros(np.shape(image))
-        nlinhas, ncolunas = np.shape(image)
-        # print(f"Linhas: {nlinhas}, Colunas: {ncolunas}")
-
-        # PERCORRE A IMAGEM
-        for x in range(nlinhas):
-            for y in range(ncolunas):
-                r = image[x][y]
-                # PERCORRE A MASCARA NO PONTO DA IMAGEM
-                region_values = []
-                adjust_x = x - (n_masklin // 2)
-                adjust_y = y - (n_maskcol // 2)
-                for i in range(n_masklin):
-                    for j in range(n_maskcol):
-                        try:
-                            region_values.append(image[adjust_x + i][adjust_y + j])
-                        except:
-                            region_values.append(r)
-                result = 0
-                if metrica == "moda":
-                    result = max(set(region_values), key=region_values.count)
-                elif metrica == "mediana":
-                    result = np.median(region_values)
-                elif metrica == "media":
-                    result = np.mean(region_values)
-                elif metrica == "max":
-                    result = max(region_values)
-                elif metrica == "min":
-                    result = min(region_values)
-
-                # seta valor filtradon na nova imagem
-                new_matriz_img[x][y] = int(result)
-                # print(region_values)
-                # print(f"({x},{y}) = {r} -> {result}")
-        return new_matriz_img
-
-    def statistical_filter(self, mask_size, metrica="moda"):
+    def spacial_response(image, mask, c_mask=None, bordas=None, versao=None, modo="edge", **parametros):
+        """
+        Resultado do spacial_filter para uma matriz (ou pilha de matrizes), sem alterá-la.
+        :param bordas, versao, modo: tratamento das bordas, como no conv_filter
+        """
+        if isinstance(mask, str):
+            filtros = SpacialFilters()
+            funcao = filtros.get_parametric_filter(mask)
+            if funcao is not None:
+                if c_mask is not None:
+                    raise ValueError(f"O filtro paramétrico '{mask}' não usa c_mask; "
+                                     f"informe os parâmetros por nome (ex.: sigma=3.0).")
+                return np.trunc(funcao(image, bordas=bordas, versao=versao, modo=modo, **parametros))
+            filtro = filtros.get_filter(mask)
+            if filtro is None:
+                raise ValueError(f"Filtro '{mask}' não encontrado.")
+            constante, mask = filtro
+            if c_mask is None:
+                c_mask = constante
+        if parametros:
+            raise ValueError(f"Parâmetros não suportados por filtros de máscara fixa: {sorted(parametros)}.")
+        if c_mask is None:
+            c_mask = 1.0
+        soma = ImagePGMHelper.conv_filter(image, mask, c_mask, bordas, versao, modo)
+        if np.min(soma) < 0:
+          soma = np.abs(soma)
+        return soma
+
+    @staticmethod
+    def gradient(image, mask_x, mask_y, c_x=1.0, c_y=1.0, norma="L2", orientacao=False,
+                 bordas=None, versao=None, modo="edge"):
+        """
+        Calcula o gradiente da imagem em uma única passada vetorizada.
+        Cada vizinhança é lida uma vez e contribui ao mesmo tempo para Gx e Gy,
+        sem o np.abs do spacial_filter (o sinal é mantido para a orientação).
+        :param image: matriz da imagem
+        :param mask_x: máscara da componente horizontal (ex.: sobel_h_3x3)
+        :param mask_y: máscara da componente vertical (ex.: sobel_v_3x3)
+        :param norma: "L1" (|Gx| + |Gy|) ou "L2" (sqrt(Gx² + Gy²))
+        :param orientacao: se True, calcula também atan2(Gy, Gx) em radianos
+        :param bordas, versao, modo: tratamento das bordas, como no conv_filter
+        :return: tupla (gx, gy, magnitude, theta); theta é None se orientacao=False
+        """
+        mask_x = np.asarray(mask_x)
+        mask_y = np.asarray(mask_y)
+        if mask_x.shape != mask_y.shape:
+            raise ValueError("As máscaras X e Y precisam ter o mesmo tamanho.")
+        if norma not in ("L1", "L2"):
+            raise ValueError("Norma deve ser 'L1' ou 'L2'.")
+        n_masklin, n_maskcol = mask_x.shape
+
+        def componentes(bloco):
+            nlinhas = bloco.shape[-2] - n_masklin + 1
+            ncolunas = bloco.shape[-1] - n_maskcol + 1
+            g = np.zeros((2,) + bloco.shape[:-2] + (nlinhas, ncolunas))
+            for i in range(n_masklin):
+                for j in range(n_maskcol):
+                    wx = c_x * mask_x[i][j]
+                    wy = c_y * mask_y[i][j]
+                    if wx == 0 and wy == 0:
+                        continue
+                    # JANELA DESLOCADA LIDA UMA UNICA VEZ PARA AS DUAS COMPONENTES
+                    view = bloco[..., i:i + nlinhas, j:j + ncolunas]
+                    if wx != 0:
+                        g[0] += wx * view
+                    if wy != 0:
+                        g[1] += wy * view
+            return g
+
+        if bordas is None:
+            bordas = BorderCache()
+        gx, gy = bordas.apply(np.asarray(image, dtype=float), mask_x.shape, componentes, modo=modo, versao=versao)
+
+        if norma == "L1":
+            magnitude = np.abs(gx) + np.abs(gy)
+        else:
+            magnitude = np.hypot(gx, gy)
+        theta = np.arctan2(gy, gx) if orientacao else None
+        return gx, gy, magnitude, theta
+
+    def gradient_filter(self, operador="sobel", norma="L2", orientacao=False, apenas_magnitude=False, modo="edge"):
+        """
+        Aplica um operador de gradiente (ex.: "sobel", "roberts") em uma única passada.
+        A matriz da imagem passa a ser a magnitude quantizada em L níveis.
+        :param operador: nome do operador cadastrado em SpacialFilters
+        :param norma: "L1" ou "L2"
+        :param orientacao: se True, calcula também a orientação do gradiente
+                           (0 = aumento ao longo das colunas, para qualquer operador)
+        :param apenas_magnitude: se True, retorna apenas a magnitude quantizada
+        :param modo: tratamento das bordas, como no conv_filter
+        :return: magnitude quantizada ou a tupla (gx, gy, magnitude, theta)
+        """
+        gx, gy, magnitude, theta = self._resposta_gradiente(operador, norma, orientacao and not apenas_magnitude, modo)
+        self.matriz = self._adjust_final_array(magnitude)
+        if apenas_magnitude:
+            return self.matriz
+        return gx, gy, magnitude, theta
+
+    def _resposta_gradiente(self, operador="sobel", norma="L2", orientacao=False, modo="edge"):
+        """Tupla (gx, gy, magnitude, theta) do gradient_filter, sem alterar a matriz."""
+        componentes = SpacialFilters().get_gradient_operator(operador)
+        if componentes is None:
+            raise ValueError(f"Operador de gradiente '{operador}' não encontrado.")
+        (c_x, mask_x), (c_y, mask_y) = componentes
+
+        return self.gradient(self.matriz, mask_x, mask_y, c_x, c_y, norma=norma, orientacao=orientacao,
+                             bordas=self._bordas, versao=self._versao, modo=modo)
+
+    @staticmethod
+    def _moda(janelas):
+        """Moda ao longo do último eixo; em caso de empate vence o menor valor."""
+        ordenado = np.sort(janelas, axis=-1)
+        posicoes = np.arange(ordenado.shape[-1])
+        # INICIO DA SEQUENCIA DE VALORES IGUAIS QUE TERMINA EM CADA POSICAO
+        inicio = np.where(np.diff(ordenado, axis=-1, prepend=ordenado[..., :1] - 1) != 0, posicoes, 0)
+        inicio = np.maximum.accumulate(inicio, axis=-1)
+        fim = np.argmax(posicoes - inicio, axis=-1)
+        return np.take_along_axis(ordenado, fim[..., None], axis=-1)[..., 0]
+
+    @staticmethod
+    def statist_filter(image, mask_size, metrica="moda", bordas=None, versao=None, modo="edge"):
+        """
+        Executa um filtro estatistico na imagem.
+        :param bordas, versao, modo: tratamento das bordas, como no conv_filter
+        """
+
+        def estatistica(bloco):
+            janelas = np.lib.stride_tricks.sliding_window_view(bloco, (mask_size, mask_size), axis=(-2, -1))
+            janelas = janelas.reshape(janelas.shape[:-2] + (mask_size * mask_size,))
+            if metrica == "moda":
+                result = ImagePGMHelper._moda(janelas)
+            elif metrica == "mediana":
+                result = np.median(janelas, axis=-1)
+            elif metrica == "media":
+                result = np.mean(janelas, axis=-1)
+            elif metrica == "max":
+                result = np.max(janelas, axis=-1)
+            elif metrica == "min":
+                result = np.min(janelas, axis=-1)
+            else:
+                result = np.zeros(janelas.shape[:-1])
+            return np.trunc(result).astype(float)
+
+        if bordas is None:
+            bordas = BorderCache()
+        return bordas.apply(image, (mask_size, mask_size), estatistica, modo=modo, versao=versao)
+
+    def statistical_filter(self, mask_size, metrica="moda", modo="edge"):
         """Aplica um filtro espacial em uma imagem."""
-        self.matriz = self.statist_filter(self.matriz, mask_size, metrica)
+        self.matriz = self.statist_filter(self.matriz, mask_size, metrica, self._bordas, self._versao, modo)
 
-    def equalize(self):
+    def filter_responses(self, filtros):
+        """
+        Calcula vários filtros sobre a mesma imagem, sem alterar a matriz.
+        Todos leem o mesmo padding (um por modo de borda): um filtro com halo menor
+        recebe uma visão dele, e só um halo maior que o já guardado refaz a cópia,
+        então vale colocar primeiro o filtro de maior máscara.
+        Exemplo:
+            suave, bordas = img.filter_responses([("spacial_filter", {"mask": "gaussian", "sigma": 2.0}),
+                                                  ("gradient_filter", {"operador": "sobel"})])
+        :param filtros: lista de tuplas (nome_do_metodo, kwargs), com nome "spacial_filter",
+                        "statistical_filter" ou "gradient_filter"
+        :return: lista com a matriz que cada filtro deixaria na imagem
+        """
+        respostas = []
+        try:
+            for nome, kwargs in filtros:
+                if nome == "spacial_filter":
+                    respostas.append(self.spacial_response(self.matriz, bordas=self._bordas, versao=self._versao,
+                                                           **kwargs))
+                elif nome == "statistical_filter":
+                    respostas.append(self.statist_filter(self.matriz, bordas=self._bordas, versao=self._versao,
+                                                         **kwargs))
+                elif nome == "gradient_filter":
+                    kwargs = {chave: valor for chave, valor in kwargs.items() if chave != "apenas_magnitude"}
+                    magnitude = self._resposta_gradiente(**kwargs)[2]
+                    respostas.append(self._adjust_final_array(magnitude))
+                else:
+                    raise ValueError(f"Filtro '{nome}' não suportado; use 'spacial_filter', "
+                                     f"'statistical_filter' ou 'gradient_filter'.")
+        finally:
+            # A MATRIZ NAO MUDOU, MAS O PADDING SO INTERESSAVA A ESTE LOTE DE FILTROS
+            self._bordas.descartar()
+        return respostas
+
+    def equalize(self, nivel=0):
         """
         Realiza a equalização da imagem a partir da CDF do histograma.
+        :param nivel: nível de amostragem usado para estimar a CDF (0 = resolução original).
+                      A tabela estimada é sempre aplicada na resolução original.
         """
-        histogram = self.get_histogram()
-        cdf = [0] * len(histogram)
-        p_acumulada = 0.0
-        for i, value in enumerate(histogram):
-            p_acumulada += value / (self.num_linhas * self.num_colunas)
-            cdf[i] = p_acumulada
-
-        # plt.plot(range(len(cdf)), cdf, marker='o', linestyle='-')
-        # plt.title("Função de Distribuição Acumulada (CDF)")
-        # plt.xlabel("Valor")
-        # plt.ylabel("Probabilidade acumulada")
-        # plt.grid(True)
-        # plt.show()
+        histogram = self.get_histogram(nivel)
+        total = sum(histogram)
+        cdf = np.cumsum(np.asarray(histogram) / total)
 
         # CONSTROI UM VETOR PARA O MAPEAMENTO DO HISTOGRAMA
-        transition_table = [0] * len(histogram)
-        for i in range(len(histogram)):
-            transition_table[i] = self._adjust_final_value((self.L-1) * cdf[i])
-            pass
-        # print(transition_table)
-
-        # MONTA O NOVO HISTOGRAMA A PARTIR DO MAPEAMENTO
-        new_hitogram = [0]*len(histogram)
-        for i, value in enumerate(histogram):
-            new_hitogram[transition_table[i]] += value
-
-        self.histogram = new_hitogram
-
-        # APLICA O NOVO HISTOGRAMA NA MATRIZ DE INTENSIDADES
-        for i in range(self.num_linhas):
-            for j in range(self.num_colunas):
-                r = self.matriz[i][j]
-                # APLICA A TRANSFORMACAO
-                s = transition_table[int(r)]
-                # APLICA O VALOR AJUSTADO NA MATRIZ
-                self.matriz[i][j] = self._adjust_final_value(s)
-        pass
+        transition_table = self._adjust_final_array((self.L - 1) * cdf)
+
+        # APLICA O MAPEAMENTO NA MATRIZ; O NOVO HISTOGRAMA VEM DO ANTIGO PELA MESMA TABELA
+        self.apply_lut(transition_table)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,62 @@
+import numpy as np
+
+from BorderCache import BorderCache
+
+
+class ImagePyramid:
+    """
+    Pirâmide de resolução de uma imagem.
+    O nível 0 é a própria imagem e cada nível seguinte tem metade das linhas e colunas.
+    Os níveis são calculados sob demanda e ficam guardados para as próximas consultas.
+    Serve para prévias (show); as estimativas de histograma usam uma amostragem
+    por passo da matriz (ImagePGMHelper._amostra_nivel), bem mais barata.
+    """
+
+    MODOS = ("gaussian", "media")
+
+    # FILTRO BINOMIAL 5 TAPS (APROXIMACAO DA GAUSSIANA USADA POR BURT E ADELSON)
+    _binomial = np.array([1, 4, 6, 4, 1]) / 16.0
+
+    def __init__(self, matriz, modo="gaussian", borda="edge"):
+        """
+        :param matriz: imagem do nível 0
+        :param modo: "gaussian" (suaviza com binomial 5x5 e decima) ou "media" (média de blocos 2x2)
+        :param borda: tratamento das bordas no modo "gaussian", como no BorderCache
+        """
+        if modo not in self.MODOS:
+            raise ValueError(f"Modo de pirâmide deve ser um de {self.MODOS}.")
+        if borda not in BorderCache.MODOS:
+            raise ValueError(f"Modo de borda deve ser um de {BorderCache.MODOS}.")
+        self.modo = modo
+        self.borda = borda
+        self.niveis = [np.asarray(matriz)]
+
+    @property
+    def num_niveis(self):
+        """Número máximo de níveis (até a imagem ter 1 linha ou 1 coluna)."""
+        menor = min(np.shape(self.niveis[0]))
+        return int(np.floor(np.log2(menor))) + 1 if menor > 0 else 1
+
+    def nivel(self, n):
+        """Retorna a imagem do nível n, calculando os níveis que ainda faltam."""
+        if n < 0 or n >= self.num_niveis:
+            raise ValueError(f"Nível deve estar entre 0 e {self.num_niveis - 1}.")
+        while len(self.niveis) <= n:
+            self.niveis.append(self._reduzir(self.niveis[-1]))
+        return self.niveis[n]
+
+    def _reduzir(self, imagem):
+        """Gera o próximo nível (metade da resolução) com valores inteiros."""
+        imagem = np.asarray(imagem, dtype=float)
+        if self.modo == "gaussian":
+            # UM UNICO PADDING NOS DOIS EIXOS; A PASSADA VERTICAL MANTEM AS COLUNAS EXTRAS
+            padded = BorderCache().padded(imagem, ((2, 2), (2, 2)), self.borda)
+            nlinhas, ncolunas = imagem.shape
+            suavizada = sum(w * padded[i:i + nlinhas, :] for i, w in enumerate(self._binomial))
+            suavizada = sum(w * suavizada[:, j:j + ncolunas] for j, w in enumerate(self._binomial))
+            reduzida = suavizada[::2, ::2]
+        else:
+            nlinhas, ncolunas = (np.shape(imagem)[0] // 2) * 2, (np.shape(imagem)[1] // 2) * 2
+            blocos = imagem[:nlinhas, :ncolunas].reshape(nlinhas // 2, 2, ncolunas // 2, 2)
+            reduzida = blocos.mean(axis=(1, 3))
+        return np.rint(reduzida).astype(int)
@@ -0,0 +1,157 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from ImagePGMHelper import ImagePGMHelper
+
+
+def _carregar(caminho_arquivo):
+    """Lê e interpreta o arquivo PGM (executado em uma thread)."""
+    return ImagePGMHelper(caminho_arquivo)
+
+
+def _processar(imagem, operacoes):
+    """
+    Aplica a sequência de operações na imagem (executado em um processo do pool).
+    :param operacoes: lista de tuplas (nome_do_metodo, kwargs) do ImagePGMHelper
+    """
+    for nome, kwargs in operacoes:
+        getattr(imagem, nome)(**kwargs)
+    return imagem
+
+
+def _salvar(imagem, caminho_arquivo, formato):
+    """Escreve a imagem processada em disco (executado em uma thread)."""
+    imagem.salvar_como_pgm(caminho_arquivo, formato=formato)
+
+
+class PGMPipeline:
+    """
+    Pipeline assíncrono de carga -> processamento -> gravação de imagens PGM.
+
+    Cada estágio roda em paralelo com os demais:
+        leitura: interpreta os arquivos em uma thread;
+        processamento: aplica os filtros em um pool de processos;
+        gravação: escreve os arquivos (P5 ou P2) em uma thread.
+    Os estágios são ligados por filas limitadas, então um estágio lento segura
+    os anteriores (backpressure). Ficam em memória no máximo cerca de
+    2 * tamanho_fila + num_processos imagens (as filas mais as que estão no pool),
+    e cada uma carrega duas matrizes (matriz e matriz_original).
+
+    Exemplo:
+        pipeline = PGMPipeline([("equalize", {}), ("statistical_filter", {"mask_size": 3, "metrica": "mediana"})])
+        pipeline.executar(["Lena.pgm", "einstein.pgm"], ["results/lena.pgm", "results/einstein.pgm"])
+        print(pipeline.utilizacao)
+    """
+
+    ESTAGIOS = ("leitura", "processamento", "gravacao")
+
+    def __init__(self, operacoes, tamanho_fila=4, num_processos=None, formato="P5"):
+        """
+        :param operacoes: lista de tuplas (nome_do_metodo, kwargs) aplicadas a cada imagem
+        :param tamanho_fila: capacidade máxima de cada fila entre estágios
+        :param num_processos: número de processos do estágio de processamento
+        :param formato: formato de saída, "P5" (binário) ou "P2" (ASCII)
+        """
+        if tamanho_fila < 1:
+            raise ValueError("O tamanho da fila precisa ser pelo menos 1.")
+        if formato not in ["P2", "P5"]:
+            raise ValueError("Apenas os formatos P2 (ASCII) ou P5 (binário) são suportados.")
+        self.operacoes = list(operacoes)
+        self.tamanho_fila = tamanho_fila
+        self.num_processos = num_processos
+        self.formato = formato
+        self.utilizacao = None
+        self._tempo_ocupado = None
+
+    def executar(self, entradas, saidas):
+        """Versão síncrona de run(): executa o pipeline e retorna a utilização por estágio."""
+        return asyncio.run(self.run(entradas, saidas))
+
+    async def run(self, entradas, saidas):
+        """
+        Processa as imagens de entradas e grava em saidas (mesma ordem).
+        :return: dicionário com a fração do tempo total em que cada estágio ficou ocupado
+        Se um estágio falhar, os demais são cancelados e a exceção é propagada.
+        """
+        entradas = list(entradas)
+        saidas = list(saidas)
+        if len(entradas) != len(saidas):
+            raise ValueError("Entradas e saídas precisam ter o mesmo tamanho.")
+
+        loop = asyncio.get_running_loop()
+        fila_leitura = asyncio.Queue(maxsize=self.tamanho_fila)
+        fila_gravacao = asyncio.Queue(maxsize=self.tamanho_fila)
+        num_workers = self.num_processos or os.cpu_count() or 1
+        processadores_ativos = num_workers
+        self._tempo_ocupado = {estagio: 0.0 for estagio in self.ESTAGIOS}
+
+        with ThreadPoolExecutor(max_workers=1) as pool_leitura, \
+                ThreadPoolExecutor(max_workers=1) as pool_gravacao, \
+                ProcessPoolExecutor(max_workers=num_workers) as pool_processos:
+
+            async def medir(estagio, executor, funcao, *args):
+                inicio = time.perf_counter()
+                try:
+                    return await loop.run_in_executor(executor, funcao, *args)
+                finally:
+                    self._tempo_ocupado[estagio] += time.perf_counter() - inicio
+
+            async def leitor():
+                for caminho_entrada, caminho_saida in zip(entradas, saidas):
+                    imagem = await medir("leitura", pool_leitura, _carregar, caminho_entrada)
+                    await fila_leitura.put((imagem, caminho_saida))
+                # UM SINAL DE FIM PARA CADA WORKER DE PROCESSAMENTO
+                for _ in range(num_workers):
+                    await fila_leitura.put(None)
+
+            async def processador():
+                nonlocal processadores_ativos
+                while True:
+                    item = await fila_leitura.get()
+                    if item is None:
+                        break
+                    imagem, caminho_saida = item
+                    imagem = await medir("processamento", pool_processos, _processar, imagem, self.operacoes)
+                    await fila_gravacao.put((imagem, caminho_saida))
+                # O ULTIMO PROCESSADOR A TERMINAR AVISA O GRAVADOR
+                processadores_ativos -= 1
+                if processadores_ativos == 0:
+                    await fila_gravacao.put(None)
+
+            async def gravador():
+                while True:
+                    item = await fila_gravacao.get()
+                    if item is None:
+                        break
+                    imagem, caminho_saida = item
+                    await medir("gravacao", pool_gravacao, _salvar, imagem, caminho_saida, self.formato)
+
+            inicio = time.perf_counter()
+            tarefas = [asyncio.ensure_future(leitor())]
+            tarefas += [asyncio.ensure_future(processador()) for _ in range(num_workers)]
+            tarefas.append(asyncio.ensure_future(gravador()))
+            # TODOS OS ESTAGIOS SAO SUPERVISIONADOS JUNTOS: SE UM FALHA, OS OUTROS
+            # (QUE PODEM ESTAR PARADOS EM UMA FILA CHEIA) SAO CANCELADOS
+            try:
+                concluidas, pendentes = await asyncio.wait(tarefas, return_when=asyncio.FIRST_EXCEPTION)
+            except BaseException:
+                for tarefa in tarefas:
+                    tarefa.cancel()
+                raise
+            for tarefa in pendentes:
+                tarefa.cancel()
+            await asyncio.gather(*pendentes, return_exceptions=True)
+            for tarefa in concluidas:
+                if not tarefa.cancelled() and tarefa.exception() is not None:
+                    raise tarefa.exception()
+            duracao = time.perf_counter() - inicio
+
+        # O ESTAGIO DE PROCESSAMENTO TEM num_workers PROCESSOS EM PARALELO
+        capacidade = {"leitura": 1, "processamento": num_workers, "gravacao": 1}
+        self.utilizacao = {
+            estagio: (self._tempo_ocupado[estagio] / (duracao * capacidade[estagio]) if duracao > 0 else 0.0)
+            for estagio in self.ESTAGIOS
+        }
+        return self.utilizacao
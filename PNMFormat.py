@@ -0,0 +1,160 @@
+import re
+
+import numpy as np
+
+
+class PNMReader:
+    """
+    Leitor dos formatos Netpbm (PBM P1/P4, PGM P2/P5 e PPM P3/P6).
+    Um mesmo arquivo pode ter várias imagens concatenadas, que são lidas
+    uma de cada vez a partir do mesmo arquivo aberto.
+
+    Exemplo:
+        with PNMReader("video.pgm") as leitor:
+            for tipo, matriz, max_valor in leitor.frames():
+                ...
+    """
+
+    TIPOS = (b'P1', b'P2', b'P3', b'P4', b'P5', b'P6')
+
+    def __init__(self, caminho_arquivo):
+        self._arquivo = open(caminho_arquivo, 'rb')
+        # BYTES JA LIDOS DO ARQUIVO MAS AINDA NAO CONSUMIDOS
+        self._resto = b''
+        self._buffer = None
+
+    def close(self):
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _ler_byte(self):
+        """Lê um byte, consumindo primeiro o que sobrou da leitura anterior."""
+        if self._resto:
+            byte, self._resto = self._resto[:1], self._resto[1:]
+            return byte
+        return self._arquivo.read(1)
+
+    def _ler_token(self):
+        """
+        Lê um token do cabeçalho, ignorando espaços e comentários.
+        Consome exatamente um caractere de espaço após o token.
+        Retorna b'' se o arquivo terminou antes de algum token.
+        """
+        byte = self._ler_byte()
+        while byte.isspace() or byte == b'#':
+            if byte == b'#':
+                # COMENTARIO VAI ATE O FIM DA LINHA
+                while byte not in (b'\n', b'\r', b''):
+                    byte = self._ler_byte()
+            byte = self._ler_byte()
+        token = b''
+        while byte and not byte.isspace() and byte != b'#':
+            token += byte
+            byte = self._ler_byte()
+        if byte == b'#':
+            self._resto = byte + self._resto
+        return token
+
+    def _ler_cabecalho(self):
+        """Lê o cabeçalho da próxima imagem; retorna None no fim do arquivo."""
+        tipo = self._ler_token()
+        if tipo == b'':
+            return None
+        if tipo not in self.TIPOS:
+            raise ValueError('Apenas imagens nos formatos P1 a P6 (PBM, PGM e PPM) são suportadas.')
+        largura = int(self._ler_token())
+        altura = int(self._ler_token())
+        max_valor = 1 if tipo in (b'P1', b'P4') else int(self._ler_token())
+        return tipo, largura, altura, max_valor
+
+    def _ler_ascii(self, quantidade, padrao):
+        """Lê quantidade valores ASCII; o que sobrar da última linha volta para o resto."""
+        valores = []
+        while len(valores) < quantidade:
+            linha = self._resto or self._arquivo.readline()
+            self._resto = b''
+            if not linha:
+                raise ValueError("Arquivo terminou antes do fim dos dados da imagem.")
+            comentario = linha.find(b'#')
+            fim = comentario if comentario >= 0 else len(linha)
+            if padrao == rb'\d+':
+                # CAMINHO RAPIDO: A LINHA INTEIRA CABE NA IMAGEM ATUAL
+                tokens = linha[:fim].split()
+                if len(valores) + len(tokens) <= quantidade:
+                    valores.extend(map(int, tokens))
+                    continue
+            posicao = 0
+            for encontrado in re.finditer(padrao, linha[:fim]):
+                valores.append(int(encontrado.group()))
+                posicao = encontrado.end()
+                if len(valores) == quantidade:
+                    self._resto = linha[posicao:]
+                    break
+        return np.array(valores)
+
+    def _ler_binario(self, num_bytes):
+        """Preenche o buffer reaproveitado com num_bytes lidos via readinto."""
+        if self._buffer is None or len(self._buffer) != num_bytes:
+            self._buffer = bytearray(num_bytes)
+        visao = memoryview(self._buffer)
+        lidos = min(len(self._resto), num_bytes)
+        visao[:lidos] = self._resto[:lidos]
+        self._resto = self._resto[lidos:]
+        while lidos < num_bytes:
+            n = self._arquivo.readinto(visao[lidos:])
+            if not n:
+                raise ValueError("Arquivo terminou antes do fim dos dados da imagem.")
+            lidos += n
+        return self._buffer
+
+    def frames(self):
+        """
+        Gera as imagens do arquivo uma de cada vez como tuplas (tipo, matriz, max_valor).
+        A matriz tem forma (altura, largura) ou (altura, largura, 3) nos formatos PPM.
+        Nos formatos binários P5/P6 a matriz é uma visão do buffer interno, que é
+        reaproveitado na próxima imagem: copie-a se precisar guardá-la.
+        """
+        while True:
+            cabecalho = self._ler_cabecalho()
+            if cabecalho is None:
+                return
+            tipo, largura, altura, max_valor = cabecalho
+            canais = 3 if tipo in (b'P3', b'P6') else 1
+            forma = (altura, largura, 3) if canais == 3 else (altura, largura)
+
+            if tipo == b'P1':
+                # NO P1 OS DIGITOS PODEM VIR SEM ESPACO ENTRE ELES
+                matriz = self._ler_ascii(largura * altura, rb'[01]').reshape(forma)
+            elif tipo in (b'P2', b'P3'):
+                matriz = self._ler_ascii(largura * altura * canais, rb'\d+').reshape(forma)
+            elif tipo == b'P4':
+                # CADA LINHA OCUPA UM NUMERO INTEIRO DE BYTES
+                bytes_linha = (largura + 7) // 8
+                dados = np.frombuffer(self._ler_binario(bytes_linha * altura), dtype=np.uint8)
+                matriz = np.unpackbits(dados.reshape(altura, bytes_linha), axis=1)[:, :largura]
+            else:
+                # P5/P6 USAM 2 BYTES (BIG-ENDIAN) POR AMOSTRA QUANDO max_valor > 255
+                dtype = np.dtype(np.uint8) if max_valor < 256 else np.dtype('>u2')
+                num_bytes = largura * altura * canais * dtype.itemsize
+                matriz = np.frombuffer(self._ler_binario(num_bytes), dtype=dtype).reshape(forma)
+            yield tipo, matriz, max_valor
+
+
+def para_cinza(tipo, matriz, max_valor):
+    """
+    Converte uma imagem lida pelo PNMReader para níveis de cinza inteiros.
+        PBM: 1 é preto, então o pixel vira 1 - bit (L = 2);
+        PPM: luminância 0.299 R + 0.587 G + 0.114 B, arredondada.
+    :return: tupla (matriz, L)
+    """
+    if tipo in (b'P1', b'P4'):
+        return 1 - matriz.astype(int), 2
+    if tipo in (b'P3', b'P6'):
+        luminancia = matriz @ np.array([0.299, 0.587, 0.114])
+        return np.rint(luminancia).astype(int), max_valor + 1
+    return matriz.astype(int), max_valor + 1